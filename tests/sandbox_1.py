@@ -33,4 +33,17 @@ def buffer():
     return ret.getvalue()
 
 
+@coach.measure
+def list_join():
+    return ''.join([s for s in strings])
+
+
+@coach.measure
+def bytearr():
+    buf = bytearray()
+    for s in strings:
+        buf.extend(s.encode('ascii'))
+    return buf.decode('ascii')
+
+
 coach.compare().bar()
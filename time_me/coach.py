@@ -1,8 +1,10 @@
 from typing import Union, Tuple, Dict, Mapping, Any, SupportsFloat, Iterable, Sequence
 
 from functools import total_ordering
+from itertools import islice, zip_longest
 
 from math import isclose
+from operator import attrgetter
 
 from time_me.runner import Runner, runner as to_runner, ObjectRunner
 from time_me.timer import Timer
@@ -10,14 +12,47 @@ from time_me.timer import Timer
 ArgSet_Raw = Tuple[Tuple, Dict]
 ArgSet = Union[ArgSet_Raw, Tuple, Dict]
 
+_SENTINEL = object()
+_EMPTY_TUPLE = ()
+_EMPTY_DICT = {}
+_NUMERIC = (float, int)
+_ATOMIC_TYPES = frozenset((int, float, str, bytes, bool))
+
+_plt = None
+_np = None
+
+
+def _get_plt():
+    # matplotlib is an optional dependency, and slow to import, so we only import it when plotting
+    global _plt
+    if _plt is None:
+        import matplotlib.pyplot as plt
+        _plt = plt
+    return _plt
+
+
+def _get_np():
+    # numpy is a dependency of matplotlib, so it is available whenever we plot
+    global _np
+    if _np is None:
+        import numpy as np
+        _np = np
+    return _np
+
 
 def parse_argset(a):
+    # concrete types are checked first, ABC checks are much slower
+    t = type(a)
+    if t is tuple and len(a) == 2 and type(a[0]) is tuple and type(a[1]) is dict:
+        return a
+    if t is dict:
+        return _EMPTY_TUPLE, a
     if isinstance(a, tuple) and len(a) == 2 and isinstance(a[0], tuple) and isinstance(a[1], dict):
         return a
-    elif isinstance(a, Iterable):
-        return a, {}
     elif isinstance(a, Mapping):
-        return (), a
+        return _EMPTY_TUPLE, a
+    elif isinstance(a, Iterable):
+        return a, _EMPTY_DICT
     raise TypeError(a)
 
 
@@ -27,6 +62,9 @@ class Coach:
         self._sanity_tol = sanity_tol
 
         self._measured = set()
+        # id(obj) -> (obj, latest result), filled on every measurement. holding obj keeps its id from
+        # being reused, and measured runners are kept alive through _measured anyway
+        self._result_cache = {}
 
         self.verbose = verbose
 
@@ -36,55 +74,78 @@ class Coach:
             runner(*a, **k)
 
     def sane(self, expected_value: Any, actual: Any):
-        if expected_value == actual:
-            return True
-        if isinstance(actual, (float, int)) and isinstance(expected_value, (float, int)) \
-                and isclose(actual, expected_value, abs_tol=self._sanity_tol):
-            return True
-        if isinstance(actual, Mapping) and isinstance(expected_value, Mapping) \
-                and self.sane(expected_value.items(), actual.items()):
-            return True
-        if isinstance(actual, Iterable) and isinstance(expected_value, Iterable) \
-                and type(expected_value) == type(actual):
-            i, j = iter(expected_value), iter(actual)
-            end = object()
-            while True:
-                v_1, v_2 = next(i, end), next(j, end)
-                if v_1 is end:
-                    if v_2 is end:
-                        return True
-                    break
-                if v_2 is end:
-                    break
-                if not self.sane(v_1, v_2):
-                    break
-        return False
+        if type(actual) is str and type(expected_value) is str:
+            return actual == expected_value
+        tol = self._sanity_tol
+        # a stack of pair iterators, walked depth-first and lazily, so the first mismatch returns at once
+        stack = [iter(((expected_value, actual),))]
+        while stack:
+            pair = next(stack[-1], _SENTINEL)
+            if pair is _SENTINEL:
+                stack.pop()
+                continue
+            expected_value, actual = pair
+            if expected_value is _SENTINEL or actual is _SENTINEL:
+                return False
+            if expected_value == actual:
+                continue
+            if isinstance(actual, _NUMERIC) and isinstance(expected_value, _NUMERIC):
+                # isclose (with its relative tolerance) is only needed if the absolute check fails
+                if abs(actual - expected_value) <= tol or isclose(actual, expected_value, abs_tol=tol):
+                    continue
+                return False
+            if type(actual) in _ATOMIC_TYPES:
+                return False
+            if isinstance(actual, Mapping) and isinstance(expected_value, Mapping):
+                stack.append(iter(((expected_value.items(), actual.items()),)))
+                continue
+            if not (isinstance(actual, Iterable) and isinstance(expected_value, Iterable)
+                    and type(expected_value) == type(actual)):
+                return False
+            try:
+                if len(expected_value) != len(actual):
+                    return False
+            except TypeError:
+                # not sized
+                pass
+            stack.append(zip_longest(expected_value, actual, fillvalue=_SENTINEL))
+        return True
 
     def iter_argsets(self, timer) -> Iterable[ArgSet_Raw]:
         yield ((), {})
 
     def __call__(self, runner):
+        obj = runner
         if not isinstance(runner, Runner):
             runner = to_runner(runner)
 
+        parse = parse_argset
+        sane = self.sane
         for sa, expected in self._sanity_argsets.items():
-            a, k = parse_argset(sa)
+            a, k = parse(sa)
             actual = runner(*a, **k)
-            if not self.sane(expected, actual):
+            if not sane(expected, actual):
                 raise ValueError(f'{expected} vs {actual}')
 
         timer = Timer()
+        resume = timer.resume
         n = 0
 
-        for argset in self.iter_argsets(timer):
-            a, k = argset
-            with timer.resume():
-                runner(*a, **k)
-            n += 1
+        argsets = iter(self.iter_argsets(timer))
+        while True:
+            # argsets are pulled outside the timed region, in batches that grow with n
+            batch = list(islice(argsets, max(1, n // 10)))
+            if not batch:
+                break
+            with resume():
+                for a, k in batch:
+                    runner(*a, **k)
+            n += len(batch)
 
         ret = self.Result(runner, timer, n)
         runner.assign_result(self, ret)
         self._measured.add(ret)
+        self._result_cache[id(obj)] = (obj, ret)
         return ret
 
     def measure(self, obj):
@@ -97,70 +158,100 @@ class Coach:
         if not objs:
             objs = self._measured
         results = []
+        result_cache = self._result_cache
         for o in objs:
-            if isinstance(o, __class__.Result):
+            if type(o) is __class__.Result:
                 results.append(o)
+                continue
+            cached = result_cache.get(id(o))
+            if cached is not None and cached[0] is o:
+                results.append(cached[1])
+                continue
+            res_dict = getattr(o, '__results__', None)
+            if isinstance(res_dict, Mapping) and self in res_dict:
+                results.append(res_dict[self])
             else:
-                res_dict = getattr(o, '__results__', None)
-                if isinstance(res_dict, Mapping) and self in res_dict:
-                    results.append(res_dict[self])
-                else:
-                    results.append(self(o))
+                results.append(self(o))
 
-        return self.ResultComparison(sorted(results))
+        results.sort(key=attrgetter('_per_run'))
+        return self.ResultComparison(results)
 
     def trial(self, obj_key: Union[int, str] = 0):
-        def ret(func):
-            def ret(*args, __name__=None, **kwargs):
-                if isinstance(obj_key, int):
+        # the kind of obj_key is known here, so each wrapper only handles its own case
+        if isinstance(obj_key, int):
+            def ret(func):
+                def ret(*args, __name__=None, **kwargs):
                     if len(args) <= obj_key:
-                        raise ValueError(f'trial must have at least {obj_key - 1} positional arguments')
-                    obj = args[obj_key]
-                else:
+                        raise ValueError(f'trial must have at least {obj_key + 1} positional arguments')
+                    runner = ObjectRunner(args[obj_key], func, args, kwargs)
+                    if __name__:
+                        runner.__name__ = __name__
+                    return self(runner)
+
+                return ret
+        else:
+            def ret(func):
+                def ret(*args, __name__=None, **kwargs):
                     if obj_key not in kwargs:
                         raise ValueError(f'trial must have {obj_key} keyword arguments')
-                    obj = kwargs[obj_key]
-                runner = ObjectRunner(obj, func, args, kwargs)
-                if __name__:
-                    runner.__name__ = __name__
-                return self(runner)
+                    runner = ObjectRunner(kwargs[obj_key], func, args, kwargs)
+                    if __name__:
+                        runner.__name__ = __name__
+                    return self(runner)
 
-            return ret
+                return ret
 
         return ret
 
     class Result:
+        __slots__ = ('runner', 'total_time', 'n', '_per_run')
+
         def __init__(self, runner: Runner, total_time: SupportsFloat, n: int):
             self.runner = runner
             self.total_time = float(total_time)
             self.n = n
+            self._per_run = self.total_time / n if n else float('inf')
 
         def __float__(self):
-            return self.total_time / self.n
+            return self._per_run
 
         def __lt__(self, other):
-            return float(self) < float(other)
+            if isinstance(other, __class__):
+                return self._per_run < other._per_run
+            return self._per_run < float(other)
 
         def __gt__(self, other):
-            return float(self) > float(other)
+            if isinstance(other, __class__):
+                return self._per_run > other._per_run
+            return self._per_run > float(other)
 
         def __le__(self, other):
-            return float(self) <= float(other)
+            if isinstance(other, __class__):
+                return self._per_run <= other._per_run
+            return self._per_run <= float(other)
 
         def __ge__(self, other):
-            return float(self) >= float(other)
+            if isinstance(other, __class__):
+                return self._per_run >= other._per_run
+            return self._per_run >= float(other)
 
         def __str__(self):
             if self.n > 1:
-                return f'{self.runner}: {self.total_time:.2g}/{self.n:,} = {float(self):.2g} seconds'
+                return f'{self.runner}: {self.total_time:.2g}/{self.n:,} = {self._per_run:.2g} seconds'
             return f'{self.runner}: {self.total_time:.2g} seconds'
 
         def __truediv__(self, other):
-            return float(self) / float(other)
+            if isinstance(other, __class__):
+                return self._per_run / other._per_run
+            return self._per_run / float(other)
+
+    class ResultComparison:
+        __slots__ = ('source', '_times')
 
-    class ResultComparison(Sequence[Result]):
         def __init__(self, source: Sequence):
             self.source = source
+            # the per-run times are also stored as a parallel list, for plotting
+            self._times = [r._per_run for r in source]
 
         def __iter__(self):
             yield from self.source
@@ -175,24 +266,28 @@ class Coach:
             return '\n'.join(str(r) for r in self)
 
         def bar(self, autoshow=True):
-            import matplotlib.pyplot as plt
+            plt = _get_plt()
 
-            plt.bar(
-                range(len(self)), [float(r) for r in self], tick_label=[str(r.runner) for r in self]
-            )
+            times = self._times
+            names = [str(r.runner) for r in self.source]
+            n = len(times)
+            plt.bar(_get_np().arange(n), times, tick_label=names)
             plt.ylabel('seconds / run')
 
-            comparisons = [self[0], None]
-            for i, result in enumerate(self):
-                msg = [f'{float(result):.2e} sec']
-                for cmp in comparisons:
-                    if (not cmp) or cmp <= 0 or cmp == result:
+            # each bar is compared to the fastest result, and to the result right before it
+            first = 0
+            last = None
+            for i, h in enumerate(times):
+                msg = [f'{h:.2e} sec']
+                for cmp in (first, last):
+                    # a zero time can come from a coarse clock, and can't be divided by
+                    if cmp is None or cmp == i or not times[cmp]:
                         continue
-                    msg.append(f'{result / cmp:.1f}x {cmp.runner}')
+                    msg.append(f'{h / times[cmp]:.1f}x {names[cmp]}')
 
-                plt.text(i, float(result) / 2, '\n'.join(msg), ha='center', va='center', wrap=True)
-                if result not in comparisons:
-                    comparisons[-1] = result
+                plt.text(i, h / 2, '\n'.join(msg), ha='center', va='center', wrap=True)
+                if i != first:
+                    last = i
 
             if autoshow:
                 plt.show()
@@ -202,11 +297,14 @@ class TimeLimitCoach(Coach):
     def __init__(self, time_limit, **kwargs):
         super().__init__(**kwargs)
         self.time_limit = time_limit
+        self._static_argsets = tuple(super().iter_argsets(None))
 
     def iter_argsets(self, timer) -> Iterable[ArgSet_Raw]:
-        while timer < self.time_limit:
-            for argset in super().iter_argsets(timer):
-                yield argset
+        limit = self.time_limit
+        argsets = self._static_argsets
+        seconds = timer.seconds
+        while seconds() < limit:
+            yield from argsets
 
 
 class ArgCoach(Coach):